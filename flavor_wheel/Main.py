@@ -6,8 +6,8 @@ by [SAAC](https://sca.coffee/research/coffee-tasters-flavor-wheel?page=resources
 > collaboration with World Coffee Research (WCR).
 Author: @josevnz@fosstodon.org
 """
-from io import StringIO
-from csv import DictReader
+from io import BytesIO
+import pandas as pd
 import streamlit as st
 from streamlit_elements import mui, elements
 from streamlit_elements import nivo
@@ -29,50 +29,33 @@ CHILD_COLOR = {
 }
 
 
-def load_data(raw: StringIO) -> dict[str, any]:
+@st.cache_data(show_spinner=False)
+def load_data(raw_bytes: bytes) -> dict[str, any]:
     """
-    Parse flat CSV metadata and convert it to format suitable for Graphic rendering
-    :param raw:
+    Parse flat CSV metadata and convert it to format suitable for Graphic rendering.
+    Results are cached on the raw file contents, so reruns do not parse the file again.
+    :param raw_bytes: CSV file contents
     :return:
     """
-    hierarchy = {}
-    with raw:
-        reader = DictReader(raw)
-        for row in reader:
-            basic = row["Basic"]
-            middle = row["Middle"]
-            final = row["Final"]
-            if basic not in hierarchy:
-                hierarchy[basic] = {}
-            if middle not in hierarchy[basic]:
-                hierarchy[basic][middle] = set([])
-            hierarchy[basic][middle].add(final)
+    # Empty final flavors are read as '', their middle flavor still gets a branch
+    data = pd.read_csv(BytesIO(raw_bytes), dtype=str, keep_default_na=False)
+    basic_nodes: dict[str, dict[str, any]] = {}
+    middle_nodes: dict[tuple[str, str], dict[str, any]] = {}
+    seen_finals: set[tuple[str, str, str]] = set()
+    # Build the tree while reading the rows, every node is appended to its parent when created
+    for basic, middle, final in zip(data['Basic'], data['Middle'], data['Final']):
+        if (basic_node := basic_nodes.get(basic)) is None:
+            basic_node = basic_nodes[basic] = {'name': basic, 'loc': 1, 'children': []}
+        if (middle_node := middle_nodes.get((basic, middle))) is None:
+            middle_node = middle_nodes[(basic, middle)] = {'name': middle, 'loc': 1, 'children': []}
+            basic_node['children'].append(middle_node)
+        if final and (basic, middle, final) not in seen_finals:
+            seen_finals.add((basic, middle, final))
+            middle_node['children'].append({'name': final, 'loc': 1, 'children': []})
     flavor = {
         'name': 'flavors',
-        'children': [],
+        'children': list(basic_nodes.values()),
     }
-    for basic in hierarchy:
-        basic_flavor = {
-            'name': basic,
-            'loc': 1,
-            'children': []
-        }
-        for middle in hierarchy[basic]:
-            middle_flavor = {
-                'name': middle,
-                'loc': 1,
-                'children': []
-            }
-            for final in hierarchy[basic][middle]:
-                if final:
-                    final_flavor = {
-                        'name': final,
-                        'loc': 1,
-                        'children': []
-                    }
-                    middle_flavor['children'].append(final_flavor)
-            basic_flavor['children'].append(middle_flavor)
-        flavor['children'].append(basic_flavor)
     return flavor
 
 
@@ -99,8 +82,7 @@ if __name__ == "__main__":
     )
     raw_data = None
     if uploaded_file is not None:
-        bytes_data = uploaded_file.getvalue()
-        raw_data = StringIO(bytes_data.decode('utf-8'))
+        raw_data = uploaded_file.getvalue()
         data_load_state.text(f"Loaded flavor data")
         st.success('File successfully uploaded', icon="✅")
     if raw_data:
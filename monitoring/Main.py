@@ -6,16 +6,22 @@ import os
 import textwrap
 
 import altair
-import requests
 import streamlit as st
-from pandas import DataFrame, Series, Timestamp
-from numpy import float64
-from requests import HTTPError, RequestException
+from pandas import DataFrame, Series, Timestamp, concat, to_datetime
+from numpy import asarray, float64
+from requests import HTTPError, RequestException, Session
+from requests.adapters import HTTPAdapter
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 MINUTES_BACK = 60
 DEFAULT_TIME_BACK = timedelta(minutes=-MINUTES_BACK)
 DEFAULT_QUERY = 'node_memory_MemFree_bytes'
-STEP_DURATION = "30s"
+STEP_SECONDS = 30
+STEP_DURATION = f"{STEP_SECONDS}s"
 
 
 @st.cache_data
@@ -25,21 +31,44 @@ def full_url(url: str, has_time_range: bool = True) -> str:
     return f"{url}/api/v1/query"  # Instant query
 
 
+@st.cache_resource
+def http_session() -> Session:
+    """
+    Keep one HTTP session across reruns, so connections to Prometheus are reused
+    """
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@st.cache_data(ttl=STEP_SECONDS, show_spinner=False)
 def get_metrics(
-        the_payload: dict[str, any],
+        query: str,
         url: str,
         start_range: datetime = None,
         end_range: datetime = None
 ) -> (dict[any, any], int):
-    new_query = {}
-    new_query.update(the_payload)
+    """
+    Run the query against Prometheus. Responses are cached for one step, so reruns with the same
+    time range do not hit the server again
+    """
+    new_query = {'query': query}
     if start_range and end_range:
         new_query['start'] = start_range.timestamp()
         new_query['end'] = end_range.timestamp()
         new_query['step'] = STEP_DURATION
     logging.info("url=%s, params=%s", url, new_query)
-    response = requests.get(url=url, params=new_query)
-    return response.json(), response.status_code
+    response = http_session().get(url=url, params=new_query)
+    return json_loads(response.content), response.status_code
+
+
+def align_to_step(timestamp: datetime) -> datetime:
+    """
+    Round down a timestamp to the step duration, so close reruns ask for the same time range
+    """
+    return datetime.fromtimestamp(timestamp.timestamp() // STEP_SECONDS * STEP_SECONDS)
 
 
 def transform(m_data: dict[any, any]) -> DataFrame:
@@ -48,19 +77,41 @@ def transform(m_data: dict[any, any]) -> DataFrame:
     :param m_data:
     :return: DataFrame
     """
-    df = DataFrame({
-        mtr['metric']['instance']: Series(
-            data=[float64(vl[1]) for vl in mtr['values']],
-            index=[Timestamp(vl[0], unit='s') for vl in mtr['values']],
+    series = {}
+    for mtr in m_data['data']['result']:
+        # Each sample is a [timestamp, "value"] pair, convert whole columns at once
+        values = asarray(mtr['values'], dtype=object)
+        series[mtr['metric']['instance']] = Series(
+            data=values[:, 1].astype(float64),
+            index=to_datetime(values[:, 0].astype(float64), unit='s'),
             name="Free memory (bytes)"
-        ) for mtr in m_data['data']['result']
-    })
+        )
+    df = concat(series, axis=1) if series else DataFrame()
     logging.info(f"Columns: {df.columns}")
     logging.info(f"Index: {df.index}")
     logging.info(f"Index: {df}")
     return df
 
 
+def merge(previous: DataFrame, latest: DataFrame, start_range: datetime) -> DataFrame:
+    """
+    Append the latest samples to the ones we already have, dropping the samples older than start_range
+    :param previous: Samples from earlier queries
+    :param latest: Samples from the last query, they win over previous samples with the same timestamp
+    :param start_range: Start of the time window to keep
+    :return: DataFrame
+    """
+    if previous.empty or latest.empty:
+        combined = latest if previous.empty else previous
+    else:
+        combined = concat([previous, latest])
+        combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+    if combined.empty:
+        return combined
+    # Prometheus timestamps are converted as UTC
+    return combined[combined.index >= Timestamp(start_range.timestamp(), unit='s')]
+
+
 if __name__ == "__main__":
 
     st.title("Realtime Prometheus monitoring")
@@ -82,16 +133,16 @@ if __name__ == "__main__":
             PROM_URL = full_url(os.environ['PROMETHEUS_URL'], has_time_range=True)
             st.info(f"Using '{PROM_URL}'")
             query = DEFAULT_QUERY
-            payload = {'query': query}
-            # First query we boostrap with a reasonable time range
-            END: datetime = datetime.now()
+            # First query we boostrap with a reasonable time range, after that only ask for the new samples
+            END: datetime = align_to_step(datetime.now())
             START = END + DEFAULT_TIME_BACK
-            if payload:
+            FETCH_START = max(START, st.session_state.get('prom_last_end', START))
+            if query:
                 (graph, raw) = st.tabs(["Time Series", "Debugging"])
                 metrics, code = get_metrics(
                     url=PROM_URL,
-                    the_payload=payload,
-                    start_range=START,
+                    query=query,
+                    start_range=FETCH_START,
                     end_range=END,
                 )
                 data: DataFrame = DataFrame()
@@ -100,12 +151,19 @@ if __name__ == "__main__":
                     data_load_state.info(f"Metrics data refreshed ({now}).")
                     logging.info(f"Metrics data refreshed ({now}).")
                     try:
-                        data = transform(m_data=metrics)
+                        data = merge(
+                            previous=st.session_state.get('prom_df', DataFrame()),
+                            latest=transform(m_data=metrics),
+                            start_range=START
+                        )
+                        st.session_state['prom_df'] = data
+                        st.session_state['prom_last_end'] = END
                         with graph:
                             st.title("Time series")
                             # See auto-refresh dilemma: https://github.com/streamlit/streamlit/issues/168
                             if st.button('Click to refresh!'):
                                 st.write("Refreshing")
+                                get_metrics.clear()
                                 st.experimental_rerun()
                             # st.line_chart(data=data)
                             chart = (
@@ -124,7 +182,7 @@ if __name__ == "__main__":
                             st.title("DataFrame for Free memory (bytes)")
                             st.dataframe(data)
                         st.title("Query:")
-                        st.markdown(f"```{query}, start={START}, end={END}```")
+                        st.markdown(f"```{query}, start={FETCH_START}, end={END}```")
                         st.title("Prometheus data:")
                         st.json(metrics)
                 else:
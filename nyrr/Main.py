@@ -1,9 +1,8 @@
 import sys
 from pathlib import Path
-from io import StringIO
 import streamlit as st
 
-from running import get_distances, load_data
+from running import file_hash, get_distances, load_cached_data
 
 if __name__ == "__main__":
     data_load_state = st.text('No data loaded yet...')
@@ -12,8 +11,7 @@ if __name__ == "__main__":
         st.title(f'NYRR Race results, using {sys.argv[1]}')
         race_file = Path(sys.argv[1])
         if race_file.exists():
-            with open(race_file, 'r') as race_data:
-                raw_data = race_data.read()
+            raw_data = race_file.read_bytes()
         st.success('File successfully read', icon="✅")
     else:
         st.title(f'NYRR Race results, choose a file')
@@ -24,14 +22,15 @@ if __name__ == "__main__":
             key="uploader"
         )
         if uploaded_file is not None:
-            bytes_data = uploaded_file.getvalue()
-            raw_data = StringIO(bytes_data.decode('utf-8'))
+            raw_data = uploaded_file.getvalue()
             data_load_state.text(f"Loaded race data")
             st.success('File successfully uploaded', icon="✅")
     if raw_data:
-        dataframe = load_data(raw_data)
+        race_hash = file_hash(raw_data)
+        dataframe = load_cached_data(race_hash, raw_data)
         distances = get_distances(dataframe)
-        st.session_state['race data'] = dataframe
+        # Only keep the cache key on the session, the DataFrame itself is shared by all the sessions
+        st.session_state['race hash'] = race_hash
         st.session_state['all race distances'] = distances
         if 'distance chosen' in st.session_state:
             del st.session_state['distance chosen']
@@ -1,14 +1,31 @@
 import logging
+from typing import Optional
 import streamlit as st
 from pandas import DataFrame
 
+from running import load_cached_data
+
 
 def has_basic_data() -> bool:
     """
     Check here if required session values exist. They are defined in Main page.
     :return:
     """
-    return 'race data' in st.session_state and 'all race distances' in st.session_state
+    return 'race hash' in st.session_state and 'all race distances' in st.session_state
+
+
+def get_race_data() -> Optional[DataFrame]:
+    """
+    Get the race data loaded on the Main page. It can be gone from the cache (for example after clearing it), then
+    the stale race hash is removed from the session so the user is asked to load the file again.
+    :return: Race data or None if it is not available anymore
+    """
+    try:
+        return load_cached_data(st.session_state['race hash'])
+    except ValueError as val:
+        logging.warning(val)
+        del st.session_state['race hash']
+        return None
 
 
 def filter_by_distance(race_data: DataFrame, distance: str, verbose: bool = False) -> DataFrame:
@@ -19,15 +36,15 @@ def filter_by_distance(race_data: DataFrame, distance: str, verbose: bool = Fals
     :param verbose: Show extra messages on the console
     :return: Filtered dataframe
     """
-    query = f"Distance == '{distance}'"
     if verbose:
-        logging.info(f"Distance query: {query}")
-    return race_data.query(inplace=False, expr=query)
+        logging.info(f"Distance filter: {distance}")
+    return race_data[race_data['Distance'] == distance]
 
 
 if __name__ == "__main__":
 
-    if not has_basic_data():
+    race_data: Optional[DataFrame] = get_race_data() if has_basic_data() else None
+    if race_data is None:
         st.title(f"NYRR Race results")
         st.write("Please go to the main page and load the race results you want to study")
     else:
@@ -39,7 +56,7 @@ if __name__ == "__main__":
         )
 
         filtered_data_frame: DataFrame = filter_by_distance(
-            race_data=st.session_state['race data'],
+            race_data=race_data,
             distance=st.session_state['distance chosen'],
             verbose=True
         )
@@ -52,14 +69,14 @@ if __name__ == "__main__":
         tab1, tab2 = st.tabs(["NYRR place by type", "NYRR Age-graded Percent"])
         with tab1:
             st.line_chart(
-                st.session_state['race data'],
+                race_data,
                 x="Event Date",
                 y=["Overall Place", "Gender Place", "Age-Group Place", "Age-Graded Place"]
             )
         with tab2:
             st.title(f"NYRR Age-graded Percent")
             st.line_chart(
-                st.session_state['race data'],
+                race_data,
                 x="Event Date",
                 y=["Age-Graded Percent"]
             )
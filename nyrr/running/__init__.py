@@ -1,6 +1,8 @@
-from io import StringIO
+from hashlib import blake2b
+from io import BytesIO
 from pathlib import Path
 from typing import List
+import logging
 import traceback
 import sys
 
@@ -10,25 +12,73 @@ from pandas import DataFrame
 from pandas.errors import EmptyDataError
 
 DATE_COLUMN = 'Event Date'
+DISTANCE_COLUMN = 'Distance'
+CACHE_DIR = Path.home() / '.cache' / 'nyrr'
+# Bump every time load_data returns something different (columns, dtypes), so older cached files are not used
+CACHE_VERSION = 1
 
 
-def load_data(raw_data: [Path, StringIO], verbose: bool = False) -> DataFrame:
+def load_data(raw_bytes: bytes, verbose: bool = False) -> DataFrame:
+    """
+    Parse the race results CSV.
+    :param raw_bytes: CSV file contents
+    :param verbose: Show extra messages
+    :return: Race results
+    """
     data: DataFrame
-    if isinstance(raw_data, StringIO) or isinstance(raw_data, Path):
+    if isinstance(raw_bytes, bytes):
         try:
-            data = pd.read_csv(raw_data)
+            # The Arrow parser does not report empty files as EmptyDataError
+            if not raw_bytes.strip():
+                raise EmptyDataError("No columns to parse from file")
+            # The Arrow parser is multithreaded and also takes care of the date conversion
+            data = pd.read_csv(BytesIO(raw_bytes), engine='pyarrow', parse_dates=[DATE_COLUMN])
         except EmptyDataError:
             if verbose:
                 traceback.print_exc()
                 st.warning("Will return an empty DataFrame from load_data", file=sys.stderr)
             return DataFrame()
     else:
-        raise ValueError(f"I don't now how to handle {raw_data}")
-    data[DATE_COLUMN] = pd.to_datetime(data[DATE_COLUMN])
+        raise ValueError(f"I don't now how to handle {raw_bytes}")
+    # Few distinct distances repeated on every race, faster to compare and smaller as a category
+    data[DISTANCE_COLUMN] = data[DISTANCE_COLUMN].astype('category')
+    return data
+
+
+def file_hash(raw_bytes: bytes) -> str:
+    return blake2b(raw_bytes, digest_size=16).hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def load_cached_data(race_hash: str, _raw_bytes: bytes = None, verbose: bool = False) -> DataFrame:
+    """
+    Same as load_data, but the parsed results are kept in memory and as a Feather file on disk, so the same file
+    uploaded again (even after a restart) is not parsed again. The returned DataFrame is shared by all the sessions,
+    do not modify it.
+    :param race_hash: file_hash of the CSV file contents, used as the cache key
+    :param _raw_bytes: CSV file contents, only needed the first time the file is seen. Not hashed by Streamlit
+    :param verbose: Show extra messages
+    :return: Race results
+    """
+    cached_file = CACHE_DIR / f"{race_hash}-v{CACHE_VERSION}.feather"
+    if cached_file.exists():
+        return pd.read_feather(cached_file)
+    if _raw_bytes is None:
+        raise ValueError(f"There is no race data loaded for {race_hash}")
+    data = load_data(_raw_bytes, verbose)
+    if not data.empty:
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, a partial file must never look like a cache hit
+            tmp_file = cached_file.with_suffix('.tmp')
+            data.to_feather(tmp_file)
+            tmp_file.replace(cached_file)
+        except OSError:
+            logging.exception(f"Could not cache race data on {cached_file}")
     return data
 
 
 def get_distances(df: DataFrame) -> List:
-    if 'Distance' in df:
-        return [x for x in set(df.get(["Distance"]).to_dict(orient='list')['Distance'])]
+    if DISTANCE_COLUMN in df:
+        return df[DISTANCE_COLUMN].cat.categories.tolist()
     return []
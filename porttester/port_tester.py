@@ -2,34 +2,101 @@
 import logging
 import textwrap
 import socket
-from typing import Any
-from yaml import load
+import asyncio
+from typing import Any, Callable, Optional
+# Only the libyaml backed loader, do not fall back silently to the pure Python one
+from yaml import CSafeLoader, load
 import streamlit as st
+from pandas import CategoricalDtype, DataFrame, Series
 
-try:
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader
+PROGRESS_TEXT = "Scanning hosts. Please wait"
+# Keep well below the default open files limit
+MAX_CONNECTIONS = 512
+# Filtered ports never answer, do not wait for the OS default connect timeout
+CONNECT_TIMEOUT = 0.5
+STATUSES = CategoricalDtype(["Open", "Closed", "Error"])
+# Same colors used by st.info, st.warning and st.error
+STATUS_COLORS = {
+    "Open": "background-color: rgba(28, 131, 225, 0.1)",
+    "Closed": "background-color: rgba(255, 193, 7, 0.2)",
+    "Error": "background-color: rgba(255, 43, 43, 0.09)",
+}
 
 
-PROGRESS_TEXT = "Scanning hosts. Please wait"
+@st.cache_data(show_spinner=False, max_entries=1024, ttl=3600)
+def resolve(host_name: str) -> str:
+    return socket.gethostbyname(host_name)
 
 
-def check_tcp_port_xmas(dst_ip: str, dst_port: int) -> str:
+async def check_tcp_port_xmas(dst_ip: str, dst_port: int) -> str:
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            result = sock.connect_ex((dst_ip, dst_port))
-            if result == 0:
-                return "Open"
-            else:
-                return "Closed"
-    except (TypeError, PermissionError) as perm_err:
-        logging.exception(perm_err)
+        if not isinstance(dst_port, int):
+            # open_connection accepts service names or None, an empty port must not probe port 0
+            raise TypeError(f"Invalid port: {dst_port}")
+        _, writer = await asyncio.wait_for(asyncio.open_connection(dst_ip, dst_port), timeout=CONNECT_TIMEOUT)
+    except (TypeError, ValueError, OverflowError, PermissionError, socket.gaierror) as bad_target:
+        # Bad port or address on the configuration, report it without losing the rest of the scan
+        logging.exception(bad_target)
         return "Error"
+    except (asyncio.TimeoutError, OSError):
+        return "Closed"
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        # The port was open, a reset while closing does not change that
+        pass
+    return "Open"
+
+
+async def scan_all_ports(
+        targets: list[tuple[str, str, int]],
+        progress: Optional[Callable[[str, str, int, str], None]]
+) -> list[tuple[str, str, int, str]]:
+    connections = asyncio.Semaphore(MAX_CONNECTIONS)
+
+    async def probe(host_name: str, ip: str, port: int) -> tuple[str, str, int, str]:
+        async with connections:
+            return host_name, ip, port, await check_tcp_port_xmas(dst_ip=ip, dst_port=port)
+
+    results = []
+    for next_result in asyncio.as_completed([probe(host_name, ip, port) for host_name, ip, port in targets]):
+        result = await next_result
+        if progress:
+            progress(*result)
+        results.append(result)
+    return results
+
+
+def scan_ports(
+        targets: list[tuple[str, str, int]],
+        progress: Optional[Callable[[str, str, int, str], None]] = None
+) -> list[tuple[str, str, int, str]]:
+    """
+    Probe all the (host, ip, port) targets concurrently, from a single thread using asyncio.
+    :param targets: List of (host name, ip, port) to check, already resolved
+    :param progress: Called with (host name, ip, port, status) as soon as each probe finishes
+    :return: (host name, ip, port, status) tuples, in completion order
+    """
+    return asyncio.run(scan_all_ports(targets, progress))
+
+
+def summarize(results: DataFrame) -> Series:
+    """
+    Count how many ports ended up on each status. Status is categorical, so this is a count over the category codes
+    :param results: Scan results, with a Status column
+    :return: Number of ports per status, including the ones with no ports
+    """
+    return results['Status'].value_counts(sort=False)
+
+
+def color_status(statuses: Series) -> list[str]:
+    return [STATUS_COLORS.get(status, "") for status in statuses]
 
 
-def load_config(stream) -> Any:
-    return load(stream, Loader=Loader)
+@st.cache_data(show_spinner=False)
+def load_config(stream_bytes: bytes) -> Any:
+    return load(stream_bytes, Loader=CSafeLoader)
 
 
 if __name__ == "__main__":
@@ -44,29 +111,34 @@ if __name__ == "__main__":
         key="portscan_config"
     )
     if st.session_state['portscan_config']:
-        yaml = load_config(st.session_state['portscan_config'])
+        yaml = load_config(st.session_state['portscan_config'].getvalue())
         hosts_details = yaml['hosts']
         chunks = len(hosts_details)
         try:
             data_load_state = st.text('Preparing to scan...')
             with st.spinner(f"Total hosts to scan: {chunks}"):
-                ip = None
+                targets = []
+                unresolved = []
                 for host in hosts_details:
                     host_name = host['name'].strip()
-                    ports = host['ports']
                     try:
-                        ip = socket.gethostbyname(host_name)
-                        for port in ports:
-                            status = check_tcp_port_xmas(dst_ip=ip, dst_port=port)
-                            data_load_state.text(f"Processing: {host_name}({ip}):{port}, status={status}")
-                            if status == "Open":
-                                st.info(f"{host_name}:{port}, status={status}")
-                            elif status == "Closed":
-                                st.warning(f"{host_name}:{port}, status={status}")
-                            else:
-                                st.error(f"{host_name}:{port}, status={status}")
-                    except TypeError as os_err:
-                        raise
+                        ip = resolve(host_name)
+                    except socket.gaierror as dns_err:
+                        # Keep scanning the other hosts, report all the ports of this one as errors
+                        logging.exception(dns_err)
+                        unresolved.extend((host_name, None, port, "Error") for port in host['ports'])
+                        continue
+                    targets.extend((host_name, ip, port) for port in host['ports'])
+                results = unresolved + scan_ports(
+                    targets,
+                    progress=lambda host_name, ip, port, status: data_load_state.text(
+                        f"Processing: {host_name}({ip}):{port}, status={status}"
+                    )
+                )
+            scan_results = DataFrame(results, columns=["Host", "IP", "Port", "Status"]).astype({'Status': STATUSES})
+            for column, (status, count) in zip(st.columns(len(STATUSES.categories)), summarize(scan_results).items()):
+                column.metric(label=status, value=count)
+            st.dataframe(scan_results.style.apply(color_status, subset=['Status']))
             data_load_state.success(f"Finished scanning {chunks} hosts")
         except (KeyError, ValueError, OSError, TypeError) as err:
             st.error(hosts_details)